@@ -0,0 +1,107 @@
+"""
+Confusion matrix metrics and HDF5 access shared by the confusion plotting scripts.
+
+The metric functions take arrays with the TP, TN, FP, FN values along axis 1. So an (N, 4) matrix
+gives N values and an (N, 4, reps) block gives an (N, reps) result.
+"""
+
+import pathlib
+
+import h5py
+from matplotlib.axes import Axes
+import numpy as np
+
+
+# Index location in the extracted Nx4 matrix
+TP = 0
+TN = 1
+FP = 2
+FN = 3
+
+
+def accuracy(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the accuracy values for the given confusion matrix.
+    """
+    return (arr[:, TP] + arr[:, TN]) / arr.sum(axis=1)
+
+
+def precision(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the precision values for the given confusion matrix.
+    """
+    return arr[:, TP] / (arr[:, TP] + arr[:, FP])
+
+
+def sensitivity(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the sensitivity or true positive rate (TPR) values for the given confusion matrix.
+    """
+    return arr[:, TP] / (arr[:, TP] + arr[:, FN])
+
+
+def specificity(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the specificity or true negative rate (TNR) values for the given confusion matrix.
+    """
+    return arr[:, TN] / (arr[:, TN] + arr[:, FP])
+
+
+def balanced_accuracy(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the balanced accuracy values for the given confusion matrix.
+    """
+    return 0.5*( sensitivity(arr) + specificity(arr) )
+
+
+def fall_out(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the fall-out or false positive rate (FPR) values for the given confusion matrix.
+    """
+    return arr[:, FP] / (arr[:, FP] + arr[:, TN])
+
+
+def miss_rate(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the miss rate or false negative rate (FNR) values for the given confusion matrix.
+    """
+    return arr[:, FN] / (arr[:, FN] + arr[:, TP])
+
+
+METRICS = {
+    "accuracy"          : accuracy,
+    "precision"         : precision,
+    "sensitivity"       : sensitivity,
+    "specificity"       : specificity,
+    "balanced-accuracy" : balanced_accuracy,
+    "fall-out"          : fall_out,
+    "miss-rate"         : miss_rate,
+
+    "true-positive" : lambda arr: arr[:, TP],
+    "true-negative" : lambda arr: arr[:, TN],
+    "false-positive" : lambda arr: arr[:, FP],
+    "false-negative" : lambda arr: arr[:, FN],
+}
+
+
+def get_metric_group(hdf5_path: pathlib.Path) -> tuple[h5py.File, h5py.Group]:
+    """
+    Opens an HDF5 file and access the location of the Metic group.
+    The file handle is returned too so the caller can close it.
+    """
+    # Enlarged chunk cache so the reads of each confusion group share cached metadata.
+    h5_file  = h5py.File(hdf5_path, "r", rdcc_nbytes=16 << 20)
+    return h5_file, h5_file["Metric"]
+
+
+def plot_acc_pre(ax: Axes, views: np.ndarray, arr: np.ndarray) -> None:
+    """
+    Plots the accuracy and precision of the confusion matrix against the number of views added.
+    """
+    ax.set_title("Reconstruction Accuracy and Precision")
+    ax.set_xlabel("Views Added")
+
+    ax.plot(views, accuracy(arr),  "r:", linewidth=2, label='Accuracy')
+    ax.plot(views, precision(arr), "b",  linewidth=2, label='Precision')
+
+    ax.legend()
@@ -0,0 +1,90 @@
+"""
+Runs the experiments of the sweep scripts, which call the RunExperiment executable.
+"""
+
+import os
+import pathlib
+import signal
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, Sequence, TypeVar
+
+
+# Jobs are each script's own named tuple, with at least a `label` and the `stdin` to run with.
+JobT = TypeVar("JobT")
+
+# Set in a pool worker once it is interrupted.
+_interrupted = False
+
+
+def run_executable(executable_path: pathlib.Path, stdin: str, pause: bool = False) -> int:
+    """
+    Runs the executable with the given stdin and returns its exit code. When pausing, the stdin and
+    the executable's output are printed before waiting on the user.
+
+    Output is only shown when pausing. Otherwise it is sent to DEVNULL rather than buffered in the
+    parent. The stdin is encoded once and exchanged as bytes, so no text-mode encoders run on the pipes.
+    """
+    proc = subprocess.run([str(executable_path)], input=stdin.encode(),
+                          stdout=subprocess.PIPE if pause else subprocess.DEVNULL)
+    if pause:
+        print(stdin)
+        print(proc.stdout.decode())
+        input("End of process...")
+    return proc.returncode
+
+
+def _on_worker_interrupt(signum, frame) -> None:
+    global _interrupted
+    _interrupted = True
+
+
+def _init_worker() -> None:
+    """
+    Ctrl-C reaches the pool workers as well as the parent. Rather than raising inside a worker, which
+    then carries on with the jobs already queued for it, the worker notes the interrupt and starts no
+    more jobs. The executable it is running is interrupted along with it.
+    """
+    signal.signal(signal.SIGINT, _on_worker_interrupt)
+
+
+def _run_in_worker(executable_path: pathlib.Path, stdin: str) -> int:
+    """
+    Runs the executable in a pool worker, unless the worker has been interrupted.
+    """
+    if _interrupted:
+        return -signal.SIGINT
+    return run_executable(executable_path, stdin)
+
+
+def run_jobs(executable_path: pathlib.Path, jobs: Sequence[JobT],
+             pause: bool = False) -> Iterator[tuple[JobT, int]]:
+    """
+    Runs the executable for each job and yields the job with its exit code, printing the job's label
+    as it runs. Jobs are yielded as they finish, which is not necessarily the order they were given.
+
+    Each job is an independent child process. They run across one persistent pool, without spawning
+    more workers than there are jobs. Pausing waits on the terminal between jobs, so those must run
+    one at a time.
+    """
+    if pause:
+        for job in jobs:
+            print(job.label)
+            yield job, run_executable(executable_path, job.stdin, pause)
+        return
+
+    if len(jobs) == 0:
+        return
+
+    workers = min(len(jobs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+        futures = {ex.submit(_run_in_worker, executable_path, job.stdin): job for job in jobs}
+        try:
+            for future in as_completed(futures):
+                job = futures[future]
+                print(job.label)
+                yield job, future.result()
+        except BaseException:
+            # Cancel the jobs which have not started, so closing the pool only waits on those running.
+            ex.shutdown(wait=False, cancel_futures=True)
+            raise
@@ -0,0 +1,32 @@
+"""
+Project locations shared by the scripts which call the ForgeScan executables.
+"""
+
+import functools
+import os
+import pathlib
+
+
+# Find the project root and binary directory from this file's place in the `scripts` directory.
+PROJECT_ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent
+BINARIES_PATH     = PROJECT_ROOT_PATH / 'bin'
+
+
+@functools.lru_cache(maxsize=None)
+def find_executable(name: str) -> pathlib.Path:
+    """
+    Returns the path to the executable in the binary directory, regardless of its file extension.
+    The directory is scanned once for each name.
+    """
+    assert BINARIES_PATH.exists() and \
+           BINARIES_PATH.is_dir(),    \
+           f"Cannot find binary directory: {BINARIES_PATH}"
+
+    # Scan with `os.scandir` so each entry's type comes from the directory listing, without a stat call.
+    with os.scandir(BINARIES_PATH) as it:
+        executable_path = next((pathlib.Path(entry.path) for entry in it
+                                if entry.name.startswith(name) and entry.is_file()), None)
+
+    assert executable_path is not None, \
+           f"Cannot find executable {name} in: {BINARIES_PATH}"
+    return executable_path
@@ -17,7 +17,7 @@ EXECUTABLE_PATH = None
 TRUTH_FILES = ["rotor-blade", "bunny"]
 
 # Find the project root and binary directory and the executable (regardless of its file extension).
-PROJECT_ROOT_PATH = pathlib.Path(__file__).parent.resolve().parent.parent
+PROJECT_ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent.parent
 BINARIES_PATH     = PROJECT_ROOT_PATH / 'bin'
 assert BINARIES_PATH.exists() and \
        BINARIES_PATH.is_dir(),    \
@@ -146,7 +146,7 @@ def call_process(fpath: pathlib.Path, scene: pathlib.Path, intr: list[tuple[str,
     stdin += policy
     if (policy_name == "Axis_Random"):
         # Axis Random always takes six views before taking a random axis.
-        stdin += " --n-views 6 --n-repeat " + str(n_views / 6)
+        stdin += " --n-views 6 --n-repeat " + str(n_views // 6)
     else:
         stdin += " --n-views " + str(n_views)
     stdin += " --seed "  + str(seed) + STDIN_NEWLINE
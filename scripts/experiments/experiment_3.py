@@ -4,35 +4,27 @@ un-ordered spherical sampling.
 """
 
 import argparse
+import csv
+import os
 import pathlib
-import subprocess
-import random
+import sys
+from typing import NamedTuple
+
+import numpy as np
+
+# Shared helpers live in the parent `scripts` directory.
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+from _experiment_core import run_jobs
+from _paths import PROJECT_ROOT_PATH, find_executable
 
 
 ## ----------------------- LOCATE EXECUTABLE FILES AND GROUND TRUTH DATA ----------------------- ##
 
 HDF5_EXTENSION  = ".h5"
 EXECUTABLE_NAME = 'RunExperiment'
-EXECUTABLE_PATH = None
+EXECUTABLE_PATH = find_executable(EXECUTABLE_NAME)
 TRUTH_FILES = ["rotor-blade", "bunny"]
 
-# Find the project root and binary directory and the executable (regardless of its file extension).
-PROJECT_ROOT_PATH = pathlib.Path(__file__).parent.resolve().parent.parent
-BINARIES_PATH     = PROJECT_ROOT_PATH / 'bin'
-assert BINARIES_PATH.exists() and \
-       BINARIES_PATH.is_dir(),    \
-       f"Cannot find binary directory: {BINARIES_PATH}"
-
-for item in BINARIES_PATH.iterdir():
-    if item.is_file() and item.name.find(EXECUTABLE_NAME) == 0:
-        EXECUTABLE_PATH = item
-        break
-
-assert EXECUTABLE_PATH is not None and \
-       EXECUTABLE_PATH.exists() and    \
-       EXECUTABLE_PATH.is_file(),      \
-       F"Cannot find executable in: {EXECUTABLE_PATH}"
-
 
 # Find the GroundTruth directory and all of the HSF5 scene files in it.
 GROUND_TRUTH_PATH = PROJECT_ROOT_PATH / "share" / "Experiments" / "GroundTruth"
@@ -41,11 +33,12 @@ assert GROUND_TRUTH_PATH.exists() and \
        f"Cannot find GroundTruth directory: {GROUND_TRUTH_PATH}"
 
 GROUND_TRUTH_FILES: list[pathlib.Path] = []
-for item in GROUND_TRUTH_PATH.iterdir():
-    if item.is_file() and item.name.endswith(HDF5_EXTENSION):
-        fname = item.name.removesuffix(HDF5_EXTENSION)
-        if fname in TRUTH_FILES:
-            GROUND_TRUTH_FILES.append(item)
+with os.scandir(GROUND_TRUTH_PATH) as it:
+    for entry in it:
+        if entry.is_file() and entry.name.endswith(HDF5_EXTENSION):
+            fname = entry.name.removesuffix(HDF5_EXTENSION)
+            if fname in TRUTH_FILES:
+                GROUND_TRUTH_FILES.append(pathlib.Path(entry.path))
 
 assert len(GROUND_TRUTH_FILES) == 2, \
        f"Found {len(GROUND_TRUTH_FILES)} of 2 expected files in: {GROUND_TRUTH_PATH} \
@@ -118,38 +111,62 @@ METHODS: list[tuple[str, str, str]] = [
 ]
 
 
-## ------------------------------ SCRIPT METHODS AND ENTRY POINT ------------------------------- ##
+def get_stdin_template(intr: tuple[str, str, int], policy: str) -> str:
+    """
+    Returns the RunExperiment stdin for an intrinsic and policy pair. Fields which change for each
+    experiment are left as `str.format` placeholders.
+    """
+    d1, d2, _ = DIST_AND_NOISE[intr[2]]
+    return STDIN_NEWLINE.join([
+        "{fpath}",
+        "{save_images}",
+        "{scene}",
+        str(REJECTION_RATE),
+        intr[1],
+        # Occplane does not accept `seed` as an option yet.
+        policy + " --n-views {n_views} --seed {seed}",
+
+        # Add data channels
+        f"--name probability   --type Probability  --d-min -{d1} --d-max {d2} --dtype float",
+        f"--name TSDF          --type TSDF         --d-min -{d1} --d-max {d1} --dtype float",
+         "--name binary --type binary",
+
+        # Add metrics
+        "",
+    ]) + STDIN_NEWLINE
 
 
-def call_process(fpath: pathlib.Path, scene: pathlib.Path, intr: list[tuple[str, str, int]], policy_name: str,
-                 policy: str, n_views: int, seed: int = 0, parsed_args: argparse.Namespace = None):
-    stdin  = ""
-    stdin += str(fpath) + STDIN_NEWLINE
-    stdin += ("y" if parsed_args.save_images else "don't save images") + STDIN_NEWLINE
-    stdin += str(scene) + STDIN_NEWLINE
-    stdin += str(REJECTION_RATE) + STDIN_NEWLINE
-    stdin += intr[1] + STDIN_NEWLINE
-    stdin += policy
-    stdin += " --n-views " + str(n_views)
+# Static portion of the stdin for each ([Intrinsic index], [Policy name]) pair.
+STDIN_TEMPLATES: dict[tuple[int, str], str] = {
+    (intr[2], policy[0]): get_stdin_template(intr, policy[1]) for intr in INTRINSICS for policy in METHODS
+}
 
-    # Occplane does not accept `seed` as an option yet.
-    stdin += " --seed "  + str(seed) + STDIN_NEWLINE
 
-    # Add data channels
-    stdin += f"--name probability   --type Probability  --d-min -{DIST_AND_NOISE[intr[2]][0]} --d-max {DIST_AND_NOISE[intr[2]][1]} --dtype float" + STDIN_NEWLINE
-    stdin += f"--name TSDF          --type TSDF         --d-min -{DIST_AND_NOISE[intr[2]][0]} --d-max {DIST_AND_NOISE[intr[2]][0]} --dtype float" + STDIN_NEWLINE
-    stdin +=  "--name binary --type binary" + STDIN_NEWLINE
+## ------------------------------ SCRIPT METHODS AND ENTRY POINT ------------------------------- ##
+
+
+def get_stdin(fpath: pathlib.Path, scene: pathlib.Path, intr: tuple[str, str, int], policy_name: str,
+              n_views: int, seed: int = 0, parsed_args: argparse.Namespace = None) -> str:
+    """
+    Returns the RunExperiment stdin for one experiment.
+    """
+    return STDIN_TEMPLATES[(intr[2], policy_name)].format(
+        fpath=fpath,
+        save_images="y" if parsed_args.save_images else "don't save images",
+        scene=scene,
+        n_views=n_views,
+        seed=seed
+    )
 
-    # Add metrics
-    stdin += STDIN_NEWLINE
 
-    proc = subprocess.Popen(executable=EXECUTABLE_PATH, args=[], text=True,
-                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    stdout = proc.communicate(stdin)
-    if parsed_args is not None and parsed_args.pause:
-        print(stdin)
-        print(stdout[0])
-        input("End of process...")
+class Job(NamedTuple):
+    """
+    A single experiment in the sweep. Its number and result path are kept to record a failure.
+    """
+    n: int
+    label: str
+    fpath: pathlib.Path
+    stdin: str
 
 
 def main(parsed_args: argparse.Namespace) -> None:
@@ -162,7 +179,25 @@ def main(parsed_args: argparse.Namespace) -> None:
         len(N_VIEWS) * sum([m[2] for m in METHODS])
     print(f"Generating {N} experiments, beginning at experiment {start}...")
 
+    # Draw every seed for the sweep at once; experiment `n` uses `seeds[n - 1]`.
+    seeds = np.random.default_rng().integers(1, 10**8, size=N).tolist() if RANDOM_SEED else None
+
     fpath_base = PROJECT_ROOT_PATH / "share" / "Experiments" / "Experiment_3" / "Results"
+    # Find finished experiments with one walk of the results tree instead of a stat per experiment.
+    existing = set(fpath_base.glob("**/results" + HDF5_EXTENSION)) if parsed_args.no_override else set()
+
+    # A run replaces the recorded failures of every experiment it covers. A run started part way
+    # through with `--start-at` keeps those of the experiments before it.
+    failed_fpath = fpath_base / "failed.csv"
+    failed_kept: list[list[str]] = []
+    if failed_fpath.exists():
+        with open(failed_fpath, newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            failed_kept = [row for row in reader if int(row[0]) < start]
+
+    jobs: list[Job] = []
+    result_dirs: set[pathlib.Path] = set()
     for intr in INTRINSICS:
         for scene in GROUND_TRUTH_FILES:
             for policy in METHODS:
@@ -172,22 +207,42 @@ def main(parsed_args: argparse.Namespace) -> None:
                         if (n < start):
                             continue
 
-                        seed = random.randrange(1, 1e8) if RANDOM_SEED else rep
+                        seed = seeds[n - 1] if RANDOM_SEED else rep
 
                         fpath = pathlib.Path(intr[0], scene.name.removesuffix(HDF5_EXTENSION),
                                              policy[0], str(n_views), str(rep))
-                        print(f"({n} / {N}) {fpath}")
-
-                        fpath = fpath_base / fpath
-                        if fpath.exists() is False:
-                            fpath.mkdir(parents=True)
-                        fpath /= "results" + HDF5_EXTENSION
+                        label = f"({n} / {N}) {fpath}"
 
-                        if fpath.exists() is True and parsed_args.no_override:
+                        fpath = fpath_base / fpath / ("results" + HDF5_EXTENSION)
+                        if fpath in existing:
+                            print(label)
                             print("\tAlready exists. Skipping experiment...")
                             continue
 
-                        call_process(fpath, scene, intr, policy[0], policy[1], n_views, seed, parsed_args)
+                        result_dirs.add(fpath.parent)
+                        stdin = get_stdin(fpath, scene, intr, policy[0], n_views, seed, parsed_args)
+                        jobs.append(Job(n, label, fpath, stdin))
+
+    # Create every result directory before any experiment is started.
+    fpath_base.mkdir(parents=True, exist_ok=True)
+    for result_dir in result_dirs:
+        result_dir.mkdir(parents=True, exist_ok=True)
+
+    # Record each failure as its experiment finishes, so an interrupted run keeps those found so far.
+    # A header with no rows means nothing failed.
+    n_failed = 0
+    with open(failed_fpath, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["n", "return_code", "fpath"])
+        writer.writerows(failed_kept)
+        f.flush()
+        for job, code in run_jobs(EXECUTABLE_PATH, jobs, parsed_args.pause):
+            if code != 0:
+                n_failed += 1
+                writer.writerow([job.n, code, job.fpath])
+                f.flush()
+    if n_failed > 0:
+        print(f"{n_failed} of {len(jobs)} experiments failed. See: {failed_fpath}")
 
 
 if __name__ == "__main__":
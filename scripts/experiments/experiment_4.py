@@ -17,7 +17,7 @@ EXECUTABLE_PATH = None
 TRUTH_FILES = ["rotor-blade-real"]
 
 # Find the project root and binary directory and the executable (regardless of its file extension).
-PROJECT_ROOT_PATH = pathlib.Path(__file__).parent.resolve().parent.parent
+PROJECT_ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent.parent
 BINARIES_PATH     = PROJECT_ROOT_PATH / 'bin'
 assert BINARIES_PATH.exists() and \
        BINARIES_PATH.is_dir(),    \
@@ -1,13 +1,20 @@
 import argparse
+import os
 import pathlib
+import sys
 
-import h5py
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator, MultipleLocator, AutoMinorLocator
 import numpy as np
 
+# Shared helpers live in the parent `scripts` directory.
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+import _confusion_core as confusion
+from _paths import PROJECT_ROOT_PATH
 
-PROJECT_ROOT_PATH = pathlib.Path(__file__).parent.parent.resolve().parent
+# With `--draft`, figures are saved at a lower DPI and skip Pillow's JPEG optimization pass.
+DRAFT_DPI  = 150
+DRAFT_PIL_KWARGS = {"optimize": False, "quality": 85}
 
 
 ## --------------------------------------- DEFINE PLOTS ---------------------------------------- ##
@@ -59,166 +66,42 @@ def get_quantity_figure(part: str, policy: str, plot_type: str,
     return plots
 
 
-## ------------------------------- CONFUSION MATRIX CALCULATIONS ------------------------------- ##
-
-# Index location in the extracted Nx4 matrix
-TP = 0
-TN = 1
-FP = 2
-FN = 3
-
-
-def accuracy(true_positive: int,  true_negative: int,
-             false_positive: int, false_negative: int) -> float:
-    """
-    Returns the accuracy value for the given confusion matrix.
-    """
-    return (true_positive + true_negative) / float(true_positive + false_positive + true_negative + false_negative)
-
-
-def precision(true_positive: int, false_positive: int) -> float:
-    """
-    Returns the precision value for the given confusion matrix.
-    """
-    return true_positive / float(true_positive + false_positive)
-
-
-def sensitivity(true_positive: int, false_negative: int) -> float:
-    """
-    Returns the sensitivity or true positive rate (TPR) value for the given confusion matrix.
-    """
-    return true_positive / float(true_positive + false_negative)
-
-
-def specificity(true_negative: int, false_positive: int) -> float:
-    """
-    Returns the specificity or true negative rate (TPR) value for the given confusion matrix.
-    """
-    return true_negative / float(true_negative + false_positive)
-
-
-def fall_out(true_negative: int, false_positive: int) -> float:
-    """
-    Returns the fall-out or false positive rate (FPR) value for the given confusion matrix.
-    """
-    return false_positive / float(false_positive + true_negative)
-
-
-def miss_rate(true_positive: int, false_negative: int) -> float:
-    """
-    Returns the miss rate or False negative rate (FNR) value for the given confusion matrix.
-    """
-    return false_negative / float(false_negative + true_positive)
-
-
-def arr_accuracy(arr: np.ndarray):
-    """
-    Calls the `accuracy` function on the input array.
-    """
-    return accuracy(arr[TP], arr[TN], arr[FP], arr[FN])
-
-
-def arr_precision(arr: np.ndarray):
-    """
-    Calls the `precision` function on the input array.
-    """
-    return precision(arr[TP], arr[FP])
-
-
-def arr_sensitivity(arr: np.ndarray):
-    """
-    Calls the `sensitivity` function on the input array.
-    """
-    return sensitivity(arr[TP], arr[FN])
-
-
-def arr_specificity(arr: np.ndarray):
-    """
-    Calls the `specificity` function on the input array.
-    """
-    return specificity(arr[TN], arr[FP])
-
-
-def arr_balanced_accuracy(arr: np.ndarray):
-    """
-    Calls the `sensitivity` and `specificity` function on the input array to get the balanced accuracy.
-    """
-    return 0.5*( sensitivity(arr[TP], arr[FN]) + specificity(arr[TN], arr[FP]) )
-
-
-def arr_fall_out(arr: np.ndarray):
-    """
-    Calls the `fall_out` function on the input array.
-    """
-    return fall_out(arr[TN], arr[FP])
-
-
-def arr_miss_rate(arr: np.ndarray):
-    """
-    Calls the `miss_rate` function on the input array.
-    """
-    return miss_rate(arr[TP], arr[FN])
-
-
-def arr_true_positive(arr: np.ndarray):
-    """
-    Returns the count of voxels labeled as true positive.
-    """
-    return arr[TP]
-
-def arr_true_negative(arr: np.ndarray):
-    """
-    Returns the count of voxels labeled as true negative.
-    """
-    return arr[TN]
-
-def arr_false_positive(arr: np.ndarray):
-    """
-    Returns the count of voxels labeled as false positive.
-    """
-    return arr[FP]
-
-def arr_false_negative(arr: np.ndarray):
-    """
-    Returns the count of voxels labeled as false negative.
-    """
-    return arr[FN]
-
-
-
+# Figure factory for each plot option. The plotted values come from `confusion.METRICS`.
 PLOT_OPTIONS = {
-    "accuracy"          : (get_probability_figure, arr_accuracy),
-    "precision"         : (get_probability_figure, arr_precision),
-    "sensitivity"       : (get_probability_figure, arr_sensitivity),
-    "specificity"       : (get_probability_figure, arr_specificity),
-    "balanced-accuracy" : (get_probability_figure, arr_balanced_accuracy),
-    "fall-out"          : (get_probability_figure, arr_fall_out),
-    "miss-rate"         : (get_probability_figure, arr_miss_rate),
-
-    "true-positive" : (get_quantity_figure, arr_true_positive),
-    "true-negative" : (get_quantity_figure, arr_true_negative),
-    "false-positive" : (get_quantity_figure, arr_false_positive),
-    "false-negative" : (get_quantity_figure, arr_false_negative),
+    "accuracy"          : get_probability_figure,
+    "precision"         : get_probability_figure,
+    "sensitivity"       : get_probability_figure,
+    "specificity"       : get_probability_figure,
+    "balanced-accuracy" : get_probability_figure,
+    "fall-out"          : get_probability_figure,
+    "miss-rate"         : get_probability_figure,
+
+    "true-positive" : get_quantity_figure,
+    "true-negative" : get_quantity_figure,
+    "false-positive" : get_quantity_figure,
+    "false-negative" : get_quantity_figure,
 }
-
+assert PLOT_OPTIONS.keys() == confusion.METRICS.keys(), \
+       "Every plot option needs both a figure and a metric."
 
 
 ## ------------------------------ SCRIPT METHODS AND ENTRY POINT ------------------------------- ##
 
 
-def get_metric_group(hdf5_path: pathlib.Path) -> h5py.Group:
+def list_subdirs(dir: pathlib.Path) -> list[pathlib.Path]:
     """
-    Opens an HDF5 file and access the location of the Metic group.
+    Returns the sub-directories of a directory. Uses `os.scandir` so the entry type comes from the
+    directory listing instead of a separate stat call per entry.
     """
-    h5_file  = h5py.File(hdf5_path, "r")
-    return h5_file["Metric"]
+    with os.scandir(dir) as it:
+        return [pathlib.Path(entry.path) for entry in it if entry.is_dir()]
 
 
 def select_experiment(dir : pathlib.Path) -> pathlib.Path:
     """
     Selects one from the possible experiment directories.
     """
-    experiments = [x for x in dir.iterdir() if x.is_dir()]
+    experiments = list_subdirs(dir)
     if len(experiments) == 0:
         print("No experiment directories available")
     elif len(experiments) == 1:
@@ -231,11 +114,12 @@ def select_experiment(dir : pathlib.Path) -> pathlib.Path:
     return experiments[idx]
 
 
-def plot_policy_sweep(policy_path: pathlib.Path, figure_root: pathlib.Path, plot_key: str):
+def plot_policy_sweep(policy_path: pathlib.Path, figure_root: pathlib.Path, plot_key: str,
+                      draft: bool = False):
     """
     Generates the accuracy and precision plots. Combines the multiple policy view into one plot and
     if the policy was repeated then it plots the min/max and average with standard deviation bars.
-    The generated figure is then saved.
+    The generated figure is then saved, at the figure's own DPI unless it is a draft.
     """
 
     confusion_groups = ["OccupancyConfusion_TSDF", "OccupancyConfusion_binary", "OccupancyConfusion_probability"]
@@ -244,45 +128,60 @@ def plot_policy_sweep(policy_path: pathlib.Path, figure_root: pathlib.Path, plot
 
     part_name   = policy_path.parent.name.capitalize()
     policy_name = policy_path.name
-    plots = PLOT_OPTIONS[plot_key][0](part_name, policy_name, plot_key, confusion_grid_labels)
+    plots = PLOT_OPTIONS[plot_key](part_name, policy_name, plot_key, confusion_grid_labels)
 
     try:
         # Sort in increasing order on integer number.
-        views_dirs = sorted([x for x in policy_path.iterdir() if x.is_dir()],
+        views_dirs = sorted(list_subdirs(policy_path),
                             key=lambda x: int(str(x.name)), reverse=True)
     except ValueError:
         print("Could not turn directory name into integer for the number of views generated by the policy.")
         raise
 
+    # Fix the x-limits to the largest view count, with the default margin, so matplotlib does not
+    # re-run x autoscaling for every line added.
+    if len(views_dirs) > 0:
+        max_views = int(views_dirs[0].name)
+        x_margin  = plots[0][1].margins()[0] * max_views
+        for _, ax in plots:
+            ax.set_xlim(-x_margin, max_views + x_margin)
+
     for views in views_dirs:
         line_label = f"{views.name} Views"
 
         views_plus_one = 1 + int(views.name)
-        xdata = list(range(views_plus_one))
+        xdata = np.arange(views_plus_one)
 
-        reps_dirs = [x for x in views.iterdir() if x.is_dir()]
-        data   = [ np.zeros((int(views.name), 4, len(reps_dirs))) ] * n_group
-        result = [ np.zeros((views_plus_one, len(reps_dirs)))     ] * n_group
+        reps_dirs = list_subdirs(views)
+        # One contiguous (reps, views, 4) block per group. Each rep is a contiguous slice, so HDF5 reads
+        # the confusion columns straight into its final location.
+        data   = [ np.empty((len(reps_dirs), int(views.name), 4)) for _ in range(n_group) ]
+        result = [ np.zeros((views_plus_one, len(reps_dirs)))     for _ in range(n_group) ]
 
         for i, reps in enumerate(reps_dirs):
             hdf5_dir = reps / "results.h5"
-            metric_group = get_metric_group(hdf5_dir)
-            for g, group in enumerate(confusion_groups):
-                confusion_group = metric_group[group]
-                data[g][:, :, i] = confusion_group.get("data")[:, 1:5]
-                result[g][1:, i] = np.apply_along_axis(PLOT_OPTIONS[plot_key][1], 1, data[g][:, :, i])
+            h5_file, metric_group = confusion.get_metric_group(hdf5_dir)
+            with h5_file:
+                for g, group in enumerate(confusion_groups):
+                    metric_group[group]["data"].read_direct(data[g][i], np.s_[:, 1:5])
+
+        for g in range(n_group):
+            # Metrics expect the confusion values on axis 1, so view the block as (views, 4, reps).
+            result[g][1:, :] = confusion.METRICS[plot_key](data[g].transpose(1, 2, 0))
 
         if len(reps_dirs) > 1:
                 line_label += " (Average)"
+                # Reduce over the reps for every group at once.
+                results    = np.stack(result)
+                result_avg = results.mean(axis=-1)
+                result_std = results.std(axis=-1)
+                result_min = results.min(axis=-1)
+                result_max = results.max(axis=-1)
         for g in range(n_group):
             if len(reps_dirs) > 1:
-                result_avg = result[g].mean(axis=1)
-                result_std = result[g].std(axis=1)
-                result_min = result[g].min(axis=1)
-                result_max = result[g].max(axis=1)
-                plots[g][1].errorbar(xdata, result_avg, result_std, linewidth=2, label=line_label, elinewidth=1, alpha=0.75, capsize=4.5)
-                plots[g][1].fill_between(xdata, result_min, result_max, alpha=0.2)
-                save_data = result_avg
+                plots[g][1].errorbar(xdata, result_avg[g], result_std[g], linewidth=2, label=line_label, elinewidth=1, alpha=0.75, capsize=4.5)
+                plots[g][1].fill_between(xdata, result_min[g], result_max[g], alpha=0.2)
+                save_data = result_avg[g]
             else:
                 plots[g][1].plot(xdata, result[g][:, 0], linewidth=2, label=line_label)
                 save_data = result
@@ -301,7 +200,10 @@ def plot_policy_sweep(policy_path: pathlib.Path, figure_root: pathlib.Path, plot
 
         image_fpath /= "_".join([policy_path.name, plot_key.capitalize(), "Results.jpeg"])
 
-        plots[g][0].savefig(image_fpath)
+        if draft:
+            plots[g][0].savefig(image_fpath, dpi=DRAFT_DPI, pil_kwargs=DRAFT_PIL_KWARGS)
+        else:
+            plots[g][0].savefig(image_fpath)
         plt.close(plots[g][0])
 
 
@@ -317,11 +219,11 @@ def main(parsed_args: argparse.Namespace) -> None:
     figures_root = parsed_args.dir / 'Figures' / results_dir.name
 
 
-    shape_dirs = [x for x in results_dir.iterdir() if x.is_dir()]
+    shape_dirs = list_subdirs(results_dir)
     for shape in shape_dirs:
-        policy_dirs = [x for x in shape.iterdir() if x.is_dir()]
+        policy_dirs = list_subdirs(shape)
         for policy in policy_dirs:
-            plot_policy_sweep(policy, figures_root, parsed_args.plot)
+            plot_policy_sweep(policy, figures_root, parsed_args.plot, parsed_args.draft)
 
 
 if __name__ == "__main__":
@@ -346,6 +248,13 @@ if __name__ == "__main__":
         help="What metric to plot. E.g., accuracy, precision."
     )
 
+    parser.add_argument(
+        "--draft",
+        action="store_true",
+        default=False,
+        help="Save figures faster at a lower resolution, for when publication quality is not needed."
+    )
+
     args = parser.parse_args()
     try:
         main(args)
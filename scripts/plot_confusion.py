@@ -1,106 +1,113 @@
 import argparse
+import os
 import pathlib
+import threading
+from multiprocessing.pool import ThreadPool
 
 import h5py
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import numpy as np
+
+import _confusion_core as confusion
 
 HDF5_EXTENSION  = ".h5"
 
+# Per-thread figures, reused from file to file when plots are only saved.
+_FIGURES = threading.local()
 
-def accuracy(true_positive: int,  true_negative: int,
-             false_positive: int, false_negative: int) -> float:
-    """
-    Returns the accuracy value for the given confusion matrix.
-    """
-    return (true_positive + true_negative) / float(true_positive + false_positive + true_negative + false_negative)
 
-
-def precision(true_positive: int, false_positive: int) -> float:
+def get_metric_occupancy_confusion_group(hdf5_path: pathlib.Path) -> tuple[h5py.File, h5py.Group]:
     """
-    Returns the precision value for the given confusion matrix.
+    Opens an HDF5 file and access the location of the Confusion Matrix data.
+    The file handle is returned too so the caller can close it.
     """
-    return true_positive / float(true_positive + false_positive)
+    h5_file, metric_group = confusion.get_metric_group(hdf5_path)
+    return h5_file, metric_group["OccupancyConfusion"]
 
 
-def get_metric_occupancy_confusion_group(hdf5_path: pathlib.Path) -> h5py.Group:
+def get_figure(name: str, parsed_args: argparse.Namespace = None) -> tuple[Figure, plt.Axes]:
     """
-    Opens an HDF5 file and access the location of the Confusion Matrix data.
+    Returns a figure and axes to plot on. Figures that are only saved are not registered with pyplot,
+    so they may be drawn from worker threads and are rendered by the Agg canvas without a GUI backend.
+    Each thread creates one such figure per name and clears its axes for every later file.
     """
-    h5_file  = h5py.File(hdf5_path, "r")
-    h5_group = h5_file["Metric"]["OccupancyConfusion"]
-    return h5_group
+    if parsed_args and parsed_args.display_only:
+        fig = plt.figure()
+        return fig, fig.add_subplot(1, 1, 1)
+
+    figure = getattr(_FIGURES, name, None)
+    if figure is None:
+        fig = Figure()
+        figure = (fig, fig.add_subplot(1, 1, 1))
+        setattr(_FIGURES, name, figure)
+    else:
+        figure[1].cla()
+    return figure
 
 
-def plot_raw_confusion(hdf5_path: pathlib.Path, data: h5py.Dataset, labels: list[str],
+def plot_raw_confusion(hdf5_path: pathlib.Path, data: np.ndarray, labels: list[str],
                        parsed_args: argparse.Namespace = None):
     """
     Creates a plot of the true/false positive/negative values.
     May plot the count of unknown values if the flag `--raw-unknown` was provided.
     """
-    fig = plt.figure()
-    ax = fig.add_subplot(1, 1, 1)
+    fig, ax = get_figure("raw", parsed_args)
 
     fig.suptitle(hdf5_path)
     ax.set_title("Raw Confusion Values")
     ax.set_xlabel("Views Added")
     ax.set_ylabel("Voxel Count")
 
-    ax.plot(data[:, 0], data[:, 1], label=labels[1])
-    ax.plot(data[:, 0], data[:, 2], label=labels[2])
-    ax.plot(data[:, 0], data[:, 3], label=labels[3])
-    ax.plot(data[:, 0], data[:, 4], label=labels[4])
-
+    columns = [1, 2, 3, 4]
     if parsed_args and parsed_args.raw_unknown:
-        ax.plot(data[:, 0], data[:, 5], label=labels[5])
+        columns.append(5)
+
+    x = data[:, 0]
+    for col in columns:
+        ax.plot(x, data[:, col], label=labels[col])
 
     ax.legend()
 
     if parsed_args and parsed_args.display_only:
         plt.show()
+        plt.close(fig)
     else:
         image_fpath = hdf5_path.parent
         image_fpath /= "acc_pre.png"
-        plt.savefig(image_fpath)
-    plt.close()
+        fig.savefig(image_fpath)
 
 
-def plot_acc_pre(hdf5_path: pathlib.Path, data: h5py.Dataset,
+def plot_acc_pre(hdf5_path: pathlib.Path, data: np.ndarray,
                  parsed_args: argparse.Namespace = None):
     """
     Creates a plot of the accuracy and precision at each step.
     """
-    acc = [ accuracy(data[i, 1], data[i, 2], data[i, 3], data[i, 4]) for i in range(data.shape[0])]
-    pre = [precision(data[i, 1], data[i, 3]) for i in range(data.shape[0])]
-
-
-    fig = plt.figure()
-    ax = fig.add_subplot(1, 1, 1)
+    fig, ax = get_figure("acc_pre", parsed_args)
 
     fig.suptitle(hdf5_path)
-    ax.set_title("Reconstruction Accuracy and Precision")
-    ax.set_xlabel("Views Added")
-
-    ax.plot(data[:, 0], acc, "r:", linewidth=2, label='Accuracy')
-    ax.plot(data[:, 0], pre, "b",  linewidth=2, label='Precision')
-
-    ax.legend()
+    confusion.plot_acc_pre(ax, data[:, 0], data[:, 1:5])
 
     if parsed_args and parsed_args.display_only:
         plt.show()
+        plt.close(fig)
     else:
         image_fpath = hdf5_path.parent
         image_fpath /= "acc_pre.png"
-        plt.savefig(image_fpath)
-    plt.close()
+        fig.savefig(image_fpath)
 
 
 def plot_file(hdf5_path: pathlib.Path, parsed_args: argparse.Namespace):
     """
     Opens an HDF5 file and accesses the data before calling the plotting functions.
     """
-    confusion_group = get_metric_occupancy_confusion_group(hdf5_path)
-    confusion_data: h5py.Dataset = confusion_group.get("data")
-    confusion_labels: list[str]  = confusion_data.attrs["header"]
+    h5_file, confusion_group = get_metric_occupancy_confusion_group(hdf5_path)
+    with h5_file:
+        confusion_dset: h5py.Dataset = confusion_group.get("data")
+        confusion_labels: list[str]  = confusion_dset.attrs["header"]
+
+        # Read the whole dataset once; slicing the h5py Dataset directly re-reads the file each time.
+        confusion_data: np.ndarray = confusion_dset[()]
     if parsed_args.plot_raw:
         plot_raw_confusion(hdf5_path, confusion_data, confusion_labels, parsed_args)
 
@@ -120,9 +127,20 @@ def main(parsed_args: argparse.Namespace):
     fpath_list = [fpath] if fpath.is_file() else list(fpath.glob(f"**/*{HDF5_EXTENSION}"))
 
     n = len(fpath_list)
-    for i, hdf5_path in enumerate(fpath_list):
-        print(f"({i} / {n}) Plotting for:\n\t{hdf5_path}")
+    if parsed_args.display_only or n <= 1:
+        for i, hdf5_path in enumerate(fpath_list):
+            print(f"({i} / {n}) Plotting for:\n\t{hdf5_path}")
+            plot_file(hdf5_path, parsed_args)
+        return
+
+    # Reading HDF5 data and rendering to PNG release the GIL, so threads overlap well here.
+    def plot_file_worker(hdf5_path: pathlib.Path) -> pathlib.Path:
         plot_file(hdf5_path, parsed_args)
+        return hdf5_path
+
+    with ThreadPool(min(n, os.cpu_count() or 1)) as pool:
+        for i, hdf5_path in enumerate(pool.imap_unordered(plot_file_worker, fpath_list)):
+            print(f"({i} / {n}) Plotted:\n\t{hdf5_path}")
 
 
 if __name__ == "__main__":
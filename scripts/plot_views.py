@@ -1,8 +1,10 @@
 import argparse
+import itertools
 import pathlib
 
 import h5py
 import matplotlib.pyplot as plt
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 import numpy as np
 
 
@@ -19,6 +21,13 @@ WIREFRAME_LINEWIDTH = 4
 
 VIEW_ID_FONT_SIZE = "xx-large"
 
+# Pairs of corner indices for the twelve edges of the grid. The corners are ordered as
+# `itertools.product` of the lower (0) and upper (1) bound on each axis, so corner `i` has the bounds
+# of `i` in binary XYZ.
+GRID_EDGES = np.array([[0, 4], [2, 6], [1, 5], [3, 7],  # Along X
+                       [0, 2], [4, 6], [1, 3], [5, 7],  # Along Y
+                       [0, 1], [4, 5], [2, 3], [6, 7]]) # Along Z
+
 
 def open_h5_file(fpath: pathlib.Path) -> h5py.Group:
     """
@@ -66,99 +75,104 @@ def plot_voxel_grid(reconstruction_group: h5py.Group,  ax: plt.Axes) -> None:
     # Plot center and grid wireframe.
     ax.scatter(center[0], center[1], center[2], color=WIREFRAME, marker='x')
 
-    side0 = np.array([[lower[0], lower[1], lower[2]],
-                      [upper[0], lower[1], lower[2]],
-                      [upper[0], upper[1], lower[2]],
-                      [lower[0], upper[1], lower[2]],
-                      [lower[0], lower[1], lower[2]]
-                    ])
-    side1 = np.array([[lower[0], lower[1], lower[2]],
-                      [lower[0], upper[1], lower[2]],
-                      [lower[0], upper[1], upper[2]],
-                      [lower[0], lower[1], upper[2]],
-                      [lower[0], lower[1], lower[2]]
-                    ])
-    side2 = np.array([[lower[0], lower[1], upper[2]],
-                      [upper[0], lower[1], upper[2]],
-                      [upper[0], upper[1], upper[2]],
-                      [lower[0], upper[1], upper[2]],
-                      [lower[0], lower[1], upper[2]]
-                    ])
-    side3 = np.array([[upper[0], lower[1], lower[2]],
-                      [upper[0], upper[1], lower[2]],
-                      [upper[0], upper[1], upper[2]],
-                      [upper[0], lower[1], upper[2]],
-                      [upper[0], lower[1], lower[2]]
-                    ])
-
-    ax.plot_wireframe(side0[:, 0], side0[:, 1], side0[:, 2], linewidth=WIREFRAME_LINEWIDTH, color=WIREFRAME)
-    ax.plot_wireframe(side1[:, 0], side1[:, 1], side1[:, 2], linewidth=WIREFRAME_LINEWIDTH, color=WIREFRAME)
-    ax.plot_wireframe(side2[:, 0], side2[:, 1], side2[:, 2], linewidth=WIREFRAME_LINEWIDTH, color=WIREFRAME)
-    ax.plot_wireframe(side3[:, 0], side3[:, 1], side3[:, 2], linewidth=WIREFRAME_LINEWIDTH, color=WIREFRAME)
-
-
-def add_view_to_plot(extr: np.array, view_id: str, ax: plt.Axes, accept: bool,
-                     parsed_args: argparse.Namespace = None) -> None:
-    """
-    Adds a view to the plot. The whole extrinsic matrix is plotted and a view ID is placed as text
-    near the location of the view. If the accepted flag is True the origin and text are colored
-    green, but if False these are colored red.
+    corners = lower + (upper - lower) * np.array(list(itertools.product([0, 1], [0, 1], [0, 1])))
+    ax.add_collection3d(Line3DCollection(corners[GRID_EDGES], linewidth=WIREFRAME_LINEWIDTH,
+                                         color=WIREFRAME))
+
+
+def read_views(dsets: list[tuple[str, h5py.Dataset]]) -> tuple[list[str], np.ndarray]:
     """
-    origin_color = GREEN
-    if accept is False:
-        origin_color = RED
+    Reads the given view datasets. Returns the view IDs and an (M, 4, 4) array of their extrinsic
+    matrices.
+    """
+    # Have HDF5 write each matrix into its slice of one preallocated buffer.
+    extrs = np.empty((len(dsets), 4, 4), dtype=np.float64)
+    for i, (_, dset) in enumerate(dsets):
+        dset.read_direct(extrs[i])
+    return [dset_name for (dset_name, _) in dsets], extrs
 
-    scale_xy = 0.25
-    scale_z  = 0.5
 
-    x_axis = extr[0:3, 0] * scale_xy
-    y_axis = extr[0:3, 1] * scale_xy
-    z_axis = extr[0:3, 2] * scale_z
-    origin = extr[0:3, 3]
+def compute_view_vectors(extrs: np.ndarray, scale_xy: float = 0.25, scale_z: float = 0.5) -> \
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes the plotted vectors of an (M, 4, 4) array of extrinsic matrices. Returns (M, 3) arrays
+    of the origins, scaled X, Y, and Z axes, and the anchor for each view's ID text.
+    """
+    x_axis = extrs[:, 0:3, 0] * scale_xy
+    y_axis = extrs[:, 0:3, 1] * scale_xy
+    z_axis = extrs[:, 0:3, 2] * scale_z
+    origin = extrs[:, 0:3, 3]
 
+    # Offset each label 0.1 back along the sum of its view's axes.
     text = x_axis + y_axis + z_axis
-    text = -0.1 * (text / np.linalg.norm(text))
-    text = origin + text
+    text = origin + text * (-0.1 / np.sqrt((text * text).sum(axis=1, keepdims=True)))
+    return origin, x_axis, y_axis, z_axis, text
+
+
+def add_views_to_plot(extrs: np.ndarray, view_ids: list[str], ax: plt.Axes, accept: bool,
+                      parsed_args: argparse.Namespace = None) -> None:
+    """
+    Adds a set of views to the plot. The whole extrinsic matrix of each view is plotted and its view
+    ID is placed as text near the location of the view. If the accepted flag is True the origins and
+    text are colored green, but if False these are colored red.
+
+    All views share one line collection per axis direction and one scatter for their origins.
+    """
+    if len(view_ids) == 0:
+        return
 
-    ax.quiver(origin[0], origin[1], origin[2], z_axis[0], z_axis[1], z_axis[2],
-              linewidth=VIEW_Z_LINEWIDTH, color=BLUE)
-    ax.scatter(origin[0], origin[1], origin[2], linewidth=VIEW_Z_LINEWIDTH, color=origin_color)
+    origin_color = GREEN
+    if accept is False:
+        origin_color = RED
+
+    origin, x_axis, y_axis, z_axis, text = compute_view_vectors(extrs)
+
+    # Each axis is an (M, 2, 3) set of segments from the view origins, drawn as a single collection.
+    ax.add_collection3d(Line3DCollection(np.stack([origin, origin + z_axis], axis=1),
+                                         linewidths=VIEW_Z_LINEWIDTH, colors=BLUE))
+    ax.scatter(*origin.T, linewidth=VIEW_Z_LINEWIDTH, color=origin_color)
 
     if parsed_args and parsed_args.only_z is False:
-        ax.quiver(origin[0], origin[1], origin[2], x_axis[0], x_axis[1], x_axis[2],
-                  linewidth=VIEW_XY_LINEWIDTH, color=RED)
-        ax.quiver(origin[0], origin[1], origin[2], y_axis[0], y_axis[1], y_axis[2],
-                  linewidth=VIEW_XY_LINEWIDTH, color=GREEN)
+        ax.add_collection3d(Line3DCollection(np.stack([origin, origin + x_axis], axis=1),
+                                             linewidths=VIEW_XY_LINEWIDTH, colors=RED))
+        ax.add_collection3d(Line3DCollection(np.stack([origin, origin + y_axis], axis=1),
+                                             linewidths=VIEW_XY_LINEWIDTH, colors=GREEN))
 
     if parsed_args is None or parsed_args.no_id is False:
-        ax.text(text[0], text[1], text[2], view_id, color=origin_color, fontsize=VIEW_ID_FONT_SIZE)
+        for (x, y, z), view_id in zip(text.tolist(), view_ids):
+            ax.text(x, y, z, view_id, color=origin_color, fontsize=VIEW_ID_FONT_SIZE)
 
 
-def add_accepted_group_to_plot(group: h5py.Group, ax: plt.Axes,
+def add_accepted_views_to_plot(dsets: list[tuple[str, h5py.Dataset]], ax: plt.Axes,
                                parsed_args: argparse.Namespace = None) -> None:
-    for (dset_name, dset) in group.items():
-        if isinstance(dset, h5py.Dataset):
-            add_view_to_plot(np.array(dset), dset_name, ax, accept=True, parsed_args=parsed_args)
+    view_ids, extrs = read_views(dsets)
+    add_views_to_plot(extrs, view_ids, ax, accept=True, parsed_args=parsed_args)
 
 
-def add_rejected_group_to_plot(group: h5py.Group, ax: plt.Axes,
+def add_rejected_views_to_plot(dsets: list[tuple[str, h5py.Dataset]], ax: plt.Axes,
                                parsed_args: argparse.Namespace = None) -> None:
-    for (dset_name, dset) in group.items():
-        if isinstance(dset, h5py.Dataset):
-            add_view_to_plot(np.array(dset), dset_name, ax, accept=False, parsed_args=parsed_args)
+    view_ids, extrs = read_views(dsets)
+    add_views_to_plot(extrs, view_ids, ax, accept=False, parsed_args=parsed_args)
 
 
 def plot_views(policy_group: h5py.Group, ax: plt.Axes, parsed_args: argparse.Namespace = None) -> None:
     """
-    Creates a plot of the accuracy and precision at each step.
+    Plots the accepted, and optionally the rejected, views of every policy in the Policy group.
     """
-    for (_, group) in policy_group.items():
-        if isinstance(group, h5py.Group):
-            for (view_group_name, group) in group.items():
-                if (view_group_name == "ACCEPT"):
-                    add_accepted_group_to_plot(group, ax, parsed_args)
-                if (view_group_name == "REJECT") and parsed_args and parsed_args.plot_rejects:
-                    add_rejected_group_to_plot(group, ax, parsed_args)
+    # One walk of the Policy group collects each `<policy>/<ACCEPT|REJECT>/<view ID>` dataset, so
+    # the views of all policies are plotted together.
+    views = {"ACCEPT": [], "REJECT": []}
+
+    def collect_view(name: str, obj: h5py.HLObject) -> None:
+        parts = name.split("/")
+        if len(parts) == 3 and parts[1] in views and isinstance(obj, h5py.Dataset):
+            views[parts[1]].append((parts[2], obj))
+
+    policy_group.visititems(collect_view)
+
+    add_accepted_views_to_plot(views["ACCEPT"], ax, parsed_args)
+    if parsed_args and parsed_args.plot_rejects:
+        add_rejected_views_to_plot(views["REJECT"], ax, parsed_args)
 
 
 def main(parsed_args: argparse.Namespace) -> None:
@@ -167,6 +181,10 @@ def main(parsed_args: argparse.Namespace) -> None:
     """
     h5_file = open_h5_file(parsed_args.file)
 
+    # A figure that is only written to disk does not need an interactive GUI backend.
+    if parsed_args.save is not None:
+        plt.switch_backend("Agg")
+
     fig = plt.figure()
     ax: plt.Axes = fig.add_subplot(111, projection='3d')
     ax.set_title("Reconstruction Views")
@@ -177,7 +195,11 @@ def main(parsed_args: argparse.Namespace) -> None:
     policy_group = get_policy_group(h5_file)
     plot_views(policy_group, ax, parsed_args)
 
-    plt.show()
+    if parsed_args.save is not None:
+        fig.savefig(parsed_args.save)
+        plt.close(fig)
+    else:
+        plt.show()
 
 
 if __name__ == "__main__":
@@ -210,6 +232,12 @@ if __name__ == "__main__":
         default=False,
         help="Will only plot the Z-axis of the view."
     )
+    parser.add_argument(
+        "--save",
+        type=pathlib.Path,
+        default=None,
+        help="Saves the plot to this image path instead of displaying it."
+    )
     args = parser.parse_args()
 
     main(args)
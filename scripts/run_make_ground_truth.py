@@ -1,26 +1,12 @@
 import argparse
+import functools
 import pathlib
 import subprocess
 
-EXECUTABLE_NAME = 'MakeGroundTruth'
-EXECUTABLE_PATH = None
-
-# Find the project root and binary directory and the executable (regardless of its file extension).
-PROJECT_ROOT_PATH = pathlib.Path(__file__).parent.resolve().parent
-BINARIES_PATH     = PROJECT_ROOT_PATH / 'bin'
-assert BINARIES_PATH.exists() and \
-       BINARIES_PATH.is_dir(),    \
-       f"Cannot find binary directory at: {BINARIES_PATH}"
-
-for item in BINARIES_PATH.iterdir():
-    if item.is_file() and item.name.find(EXECUTABLE_NAME) == 0:
-        EXECUTABLE_PATH = item
-        break
+from _paths import PROJECT_ROOT_PATH, find_executable
 
-assert EXECUTABLE_PATH is not None and \
-       EXECUTABLE_PATH.exists() and    \
-       EXECUTABLE_PATH.is_file(),      \
-       f"Cannot find executable at: {EXECUTABLE_PATH}"
+EXECUTABLE_NAME = 'MakeGroundTruth'
+EXECUTABLE_PATH = find_executable(EXECUTABLE_NAME)
 
 # File constants
 SPHERE        = "sphere"
@@ -64,136 +50,56 @@ def confirm_generate_data() -> str:
     return " y " + STDIN_NEWLINE + " y " + STDIN_NEWLINE
 
 
-def get_sphere() -> str:
-    """
-    Returns a stdin string to add the sphere mesh to the scene.
-    """
-    stdin_shape  =  "--file sphere.stl "
-    stdin_shape += STDIN_NEWLINE # End shape
-    return stdin_shape
-
-
-def get_box() -> str:
-    """
-    Returns a stdin string to add the box mesh to the scene.
-    """
-    stdin_shape  = " --file box.stl "
-    stdin_shape += STDIN_NEWLINE # End shape
-    return stdin_shape
-
-
-def get_box_rotated() -> str:
-    """
-    Returns a stdin string to add the box mesh to the scene.
-    Performs rotation on the mesh so voxel are not aligned with any of the mesh faces or edges.
-    """
-    stdin_shape  = " --file box.stl "
-    stdin_shape += get_rotation(23.81, 15.92, 0, degrees=True)
-    stdin_shape += STDIN_NEWLINE # End shape
-    return stdin_shape
-
-
-def get_bin() -> str:
-    """
-    Returns a stdin string to add the bin mesh to the scene.
-    """
-    stdin_shape  = " --file bin.stl "
-    stdin_shape += STDIN_NEWLINE # End shape
-    return stdin_shape
-
-
-def get_bunny() -> str:
-    """
-    Returns a stdin string to add the stanford bunny mesh to the scene.
-    Scales the mesh to fit the sizing of everything else.
-    """
-    stdin_shape  = " --file bunny.stl "
-    stdin_shape += get_translation(-0.2, 0, -0.4)
-    stdin_shape += STDIN_NEWLINE # End shape
-    return stdin_shape
-
-
-def get_rotor_blade() -> str:
-    """
-    Returns a stdin string to add the rotor blade to the scene.
-    Scales the mesh to fit the sizing of everything else.
-    """
-    stdin_shape  = " --file rotor_blade.stl --scale 0.3 "
-    stdin_shape += STDIN_NEWLINE # End shape
-    return stdin_shape
-
-
-def get_rotor_blade_real() -> str:
-    """
-    Returns a stdin string to add the rotor blade to the scene.
-    Scales the mesh to fit the sizing of the real part
-    """
-    stdin_shape  = " --file rotor_blade.stl --scale 0.02 "
-    stdin_shape += STDIN_NEWLINE # End shape
-    return stdin_shape
-
-
-def get_reconstruction_grid(parsed_args: argparse.Namespace) -> str:
+# ([Grid property arguments], [Translation]) for the reconstruction grid of each mesh.
+GRID_PARAMS: dict[str, tuple[dict, tuple[float, float, float]]] = {
+    SPHERE           : (dict(resolution=0.01), (-0.5, -0.5, -0.5)),
+    BOX              : (dict(), (-1, -1, -1)),
+    BOX_ROTATED      : (dict(), (-1, -1, -1)),
+    BIN              : (dict(), (-1, -1, -1)),
+    BUNNY            : (dict(), (-1, -1, -1)),
+    ROTOR_BLADE      : (dict(nx=151, ny=451, nz=101, resolution=0.01),   (-0.75, -2.25, -0.5)),
+    ROTOR_BLADE_REAL : (dict(nx=201, ny=501, nz=101, resolution=0.0005), (-0.05, -0.125, -0.025)),
+}
+
+# Stdin string to add each mesh to the scene. Each entry ends its shape with a newline.
+SCENE_STDIN: dict[str, str] = {
+    SPHERE           :  "--file sphere.stl " + STDIN_NEWLINE,
+    BOX              : " --file box.stl " + STDIN_NEWLINE,
+    # Rotate the box so voxels are not aligned with any of the mesh faces or edges.
+    BOX_ROTATED      : " --file box.stl " + get_rotation(23.81, 15.92, 0, degrees=True) + STDIN_NEWLINE,
+    BIN              : " --file bin.stl " + STDIN_NEWLINE,
+    # Place the Stanford bunny to fit the sizing of everything else.
+    BUNNY            : " --file bunny.stl " + get_translation(-0.2, 0, -0.4) + STDIN_NEWLINE,
+    # Scale the rotor blade to fit the sizing of everything else.
+    ROTOR_BLADE      : " --file rotor_blade.stl --scale 0.3 " + STDIN_NEWLINE,
+    # Scale the rotor blade to fit the sizing of the real part.
+    ROTOR_BLADE_REAL : " --file rotor_blade.stl --scale 0.02 " + STDIN_NEWLINE,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_reconstruction_grid(name: str) -> str:
     """
     Returns a stdin string to set the grid properties, rotation, and translation based on the user's
     provided ground truth name.
     """
-    stdin = ""
-    if (parsed_args.name == SPHERE):
-        stdin += get_grid_properties(resolution=0.01) + STDIN_NEWLINE
-        stdin += get_rotation(0, 0, 0)                + STDIN_NEWLINE
-        stdin += get_translation(-0.5, -0.5, -0.5)    + STDIN_NEWLINE
-    elif (parsed_args.name == BOX):
-        stdin += get_grid_properties()       + STDIN_NEWLINE
-        stdin += get_rotation(0, 0, 0)       + STDIN_NEWLINE
-        stdin += get_translation(-1, -1, -1) + STDIN_NEWLINE
-    elif (parsed_args.name == BOX_ROTATED):
-        stdin += get_grid_properties()       + STDIN_NEWLINE
-        stdin += get_rotation(0, 0, 0)       + STDIN_NEWLINE
-        stdin += get_translation(-1, -1, -1) + STDIN_NEWLINE
-    elif (parsed_args.name == BIN):
-        stdin += get_grid_properties()         + STDIN_NEWLINE
-        stdin += get_rotation(0, 0, 0)         + STDIN_NEWLINE
-        stdin += get_translation(-1, -1, -1) + STDIN_NEWLINE
-    elif (parsed_args.name == BUNNY):
-        stdin += get_grid_properties()         + STDIN_NEWLINE
-        stdin += get_rotation(0, 0, 0)         + STDIN_NEWLINE
-        stdin += get_translation(-1, -1, -1) + STDIN_NEWLINE
-    elif (parsed_args.name == ROTOR_BLADE):
-        stdin += get_grid_properties(nx=151, ny=451, nz=101, resolution=0.01) + STDIN_NEWLINE
-        stdin += get_rotation(0, 0, 0)            + STDIN_NEWLINE
-        stdin += get_translation(-0.75, -2.25, -0.5) + STDIN_NEWLINE
-    elif (parsed_args.name == ROTOR_BLADE_REAL):
-        stdin += get_grid_properties(nx=201, ny=501, nz=101, resolution=0.0005) + STDIN_NEWLINE
-        stdin += get_rotation(0, 0, 0)            + STDIN_NEWLINE
-        stdin += get_translation(-0.05, -0.125, -0.025) + STDIN_NEWLINE
-    else:
+    if name not in GRID_PARAMS:
         raise ValueError("Mesh name is invalid.")
-    return stdin
+    grid, translation = GRID_PARAMS[name]
+    parts = [get_grid_properties(**grid),
+             get_rotation(0, 0, 0),
+             get_translation(*translation)]
+    return STDIN_NEWLINE.join(parts) + STDIN_NEWLINE
 
 
-def get_scene(parsed_args: argparse.Namespace) -> str:
+@functools.lru_cache(maxsize=None)
+def get_scene(name: str) -> str:
     """
     Returns a stdin string to add shapes to the scene based on the user's specified ground truth name.
     """
-    if (parsed_args.name == SPHERE):
-        stdin_shape = get_sphere()
-    elif (parsed_args.name == BOX):
-        stdin_shape = get_box()
-    elif (parsed_args.name == BOX_ROTATED):
-        stdin_shape = get_box_rotated()
-    elif (parsed_args.name == BIN):
-        stdin_shape = get_bin()
-    elif (parsed_args.name == BUNNY):
-        stdin_shape = get_bunny()
-    elif (parsed_args.name == ROTOR_BLADE):
-        stdin_shape = get_rotor_blade()
-    elif (parsed_args.name == ROTOR_BLADE_REAL):
-        stdin_shape = get_rotor_blade_real()
-    else:
+    if name not in SCENE_STDIN:
         raise ValueError("Mesh file is invalid.")
-    stdin_shape += STDIN_NEWLINE
-    return stdin_shape
+    return SCENE_STDIN[name] + STDIN_NEWLINE
 
 
 def main(parsed_args: argparse.Namespace) -> None:
@@ -201,18 +107,20 @@ def main(parsed_args: argparse.Namespace) -> None:
     Program entry point.
     """
     fpath: pathlib.Path = parsed_args.dir
-    if fpath.exists() is False:
-        fpath.mkdir(parents=True)
+    fpath.mkdir(parents=True, exist_ok=True)
     fpath /= parsed_args.name
 
-    proc = subprocess.Popen(executable=EXECUTABLE_PATH, args=[], text=True,
+    proc = subprocess.Popen(executable=EXECUTABLE_PATH, args=[], text=True, bufsize=1,
                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    stdin  = str(fpath) + STDIN_NEWLINE
-    stdin += get_reconstruction_grid(parsed_args)
-    stdin += get_scene(parsed_args)
-    stdin += confirm_generate_data()
-    print(stdin)
-    stdout = proc.communicate(stdin)
+
+    # Stream each section to the executable, rather than joining one string to pass to communicate.
+    for stdin in (str(fpath) + STDIN_NEWLINE, get_reconstruction_grid(parsed_args.name),
+                  get_scene(parsed_args.name), confirm_generate_data()):
+        print(stdin, end="")
+        proc.stdin.write(stdin)
+        proc.stdin.flush()
+    print()
+    stdout = proc.communicate()
     print(stdout[0])
 
 
@@ -1,31 +1,20 @@
 import argparse
+import itertools
+import os
 import pathlib
-import subprocess
-import random
+from typing import NamedTuple
+
+import numpy as np
+
+from _experiment_core import run_jobs
+from _paths import PROJECT_ROOT_PATH, find_executable
 
 
 ## ----------------------- LOCATE EXECUTABLE FILES AND GROUND TRUTH DATA ----------------------- ##
 
 HDF5_EXTENSION  = ".h5"
 EXECUTABLE_NAME = 'RunExperiment'
-EXECUTABLE_PATH = None
-
-# Find the project root and binary directory and the executable (regardless of its file extension).
-PROJECT_ROOT_PATH = pathlib.Path(__file__).parent.resolve().parent
-BINARIES_PATH     = PROJECT_ROOT_PATH / 'bin'
-assert BINARIES_PATH.exists() and \
-       BINARIES_PATH.is_dir(),    \
-       f"Cannot find binary directory: {BINARIES_PATH}"
-
-for item in BINARIES_PATH.iterdir():
-    if item.is_file() and item.name.find(EXECUTABLE_NAME) == 0:
-        EXECUTABLE_PATH = item
-        break
-
-assert EXECUTABLE_PATH is not None and \
-       EXECUTABLE_PATH.exists() and    \
-       EXECUTABLE_PATH.is_file(),      \
-       F"Cannot find executable in: {EXECUTABLE_PATH}"
+EXECUTABLE_PATH = find_executable(EXECUTABLE_NAME)
 
 
 # Find the GroundTruth directory and all of the HSF5 scene files in it.
@@ -34,10 +23,9 @@ assert GROUND_TRUTH_PATH.exists() and \
        GROUND_TRUTH_PATH.is_dir(),    \
        f"Cannot find GroundTruth directory: {GROUND_TRUTH_PATH}"
 
-GROUND_TRUTH_FILES: list[pathlib.Path] = []
-for item in GROUND_TRUTH_PATH.iterdir():
-    if item.is_file() and item.name.endswith(HDF5_EXTENSION):
-        GROUND_TRUTH_FILES.append(item)
+with os.scandir(GROUND_TRUTH_PATH) as it:
+    GROUND_TRUTH_FILES: list[pathlib.Path] = [pathlib.Path(entry.path) for entry in it
+                                              if entry.name.endswith(HDF5_EXTENSION) and entry.is_file()]
 
 
 ## ----------------------------------- DEFINE FILE CONSTANTS ----------------------------------- ##
@@ -76,79 +64,102 @@ INTRINSICS: list[tuple[str, str]] = [
 ]
 
 
+# Radius option shared by every policy.
+RADIUS_ARG = f" --r {VIEW_RADIUS}"
+
 # ([Name], [Policy arg string], [Number of re-runs])
 METHODS: list[tuple[str, str, str]] = [
     (
         "Sphere_Uniform",
-        "--type sphere --uniform --r " + str(VIEW_RADIUS),
+        "--type sphere --uniform" + RADIUS_ARG,
         REGULAR_RERUNS
     ),
     (
         "Sphere_Unordered",
-        "--type sphere --uniform --unordered --r " + str(VIEW_RADIUS),
+        "--type sphere --uniform --unordered" + RADIUS_ARG,
         RANDOM_RERUNS
     ),
     (
         "Sphere_Random",
-        "--type sphere --r " + str(VIEW_RADIUS),
+        "--type sphere" + RADIUS_ARG,
         RANDOM_RERUNS
     ),
     (
         "Axis_X-axis",
-        "--type axis --x-axis --uniform --r " + str(VIEW_RADIUS),
+        "--type axis --x-axis --uniform" + RADIUS_ARG,
         REGULAR_RERUNS
     ),
     (
         "Axis_Y-axis",
-        "--type axis --y-axis --uniform --r " + str(VIEW_RADIUS),
+        "--type axis --y-axis --uniform" + RADIUS_ARG,
         REGULAR_RERUNS
     ),
     (
         "Axis_Z-axis",
-        "--type axis --z-axis --uniform --r " + str(VIEW_RADIUS),
+        "--type axis --z-axis --uniform" + RADIUS_ARG,
         REGULAR_RERUNS
     ),
     (
         "Axis_Random",
-        "--type axis --random-axis --uniform --change-random  --r " + str(VIEW_RADIUS),
+        "--type axis --random-axis --uniform --change-random " + RADIUS_ARG,
         RANDOM_RERUNS
     ),
 ]
 
 
-## ------------------------------ SCRIPT METHODS AND ENTRY POINT ------------------------------- ##
+# Data channels added to every experiment, followed by the empty line that ends the metrics.
+CHANNELS_STDIN = STDIN_NEWLINE.join([
+    f"--name probability  --type Probability  --d-min -{DIST} --d-max {DIST} --dtype float",
+    f"--name TSDF         --type TSDF         --d-min -{DIST} --d-max {DIST} --dtype float",
+     "--name binary       --type binary",
+     "",
+]) + STDIN_NEWLINE
 
-def call_process(fpath: pathlib.Path, scene: pathlib.Path, intr: str, policy_name: str,
-                 policy: str, n_views: int, seed: int = 0, parsed_args: argparse.Namespace = None):
-    stdin  = ""
-    stdin += str(fpath) + STDIN_NEWLINE
-    stdin += ("y" if parsed_args.save_images else "don't save images") + STDIN_NEWLINE
-    stdin += str(scene) + STDIN_NEWLINE
-    stdin += str(REJECTION_RATE) + STDIN_NEWLINE
-    stdin += intr + STDIN_NEWLINE
-    stdin += policy
-    if (policy_name == "Axis_Random"):
+
+def get_stdin_template(intr: tuple[str, str], policy: tuple[str, str, int]) -> str:
+    """
+    Returns the RunExperiment stdin for an intrinsic and policy pair. Fields which change for each
+    experiment are left as `str.format` placeholders.
+    """
+    if (policy[0] == "Axis_Random"):
         # Axis Random always takes five views before taking a random axis.
-        stdin += " --n-views 5 --n-repeat " + str(n_views / 5)
+        n_views_arg = " --n-views 5 --n-repeat {n_repeat}"
     else:
-        stdin += " --n-views " + str(n_views)
-    stdin += " --seed "  + str(seed) + STDIN_NEWLINE
+        n_views_arg = " --n-views {n_views}"
+
+    return STDIN_NEWLINE.join([
+        "{fpath}",
+        "{save_images}",
+        "{scene}",
+        str(REJECTION_RATE),
+        intr[1],
+        policy[1] + n_views_arg + " --seed {seed}",
+    ]) + STDIN_NEWLINE + CHANNELS_STDIN
+
+
+# Static portion of the stdin for each ([Intrinsic name], [Policy name]) pair.
+STDIN_TEMPLATES: dict[tuple[str, str], str] = {
+    (intr[0], policy[0]): get_stdin_template(intr, policy) for intr in INTRINSICS for policy in METHODS
+}
+
 
-    # Add data channels
-    stdin += f"--name probability  --type Probability  --d-min -{DIST} --d-max {DIST} --dtype float" + STDIN_NEWLINE
-    stdin += f"--name TSDF         --type TSDF         --d-min -{DIST} --d-max {DIST} --dtype float" + STDIN_NEWLINE
-    stdin +=  "--name binary       --type binary" + STDIN_NEWLINE
+## ------------------------------ SCRIPT METHODS AND ENTRY POINT ------------------------------- ##
+
+def get_stdin(fpath: str, scene: pathlib.Path, intr: tuple[str, str], policy_name: str,
+              n_views: int, seed: int = 0, parsed_args: argparse.Namespace = None) -> str:
+    return STDIN_TEMPLATES[(intr[0], policy_name)].format(
+        fpath=fpath,
+        save_images="y" if parsed_args.save_images else "don't save images",
+        scene=scene,
+        n_views=n_views,
+        n_repeat=n_views // 5,
+        seed=seed
+    )
 
-    # Add metrics
-    stdin += STDIN_NEWLINE
 
-    proc = subprocess.Popen(executable=EXECUTABLE_PATH, args=[], text=True,
-                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    stdout = proc.communicate(stdin)
-    if parsed_args is not None and parsed_args.pause:
-        print(stdin)
-        print(stdout[0])
-        input("End of process...")
+class Job(NamedTuple):
+    label: str
+    stdin: str
 
 
 def main(parsed_args: argparse.Namespace) -> None:
@@ -156,37 +167,55 @@ def main(parsed_args: argparse.Namespace) -> None:
     Program entry point.
     """
     start = parsed_args.start_at
-    n = 0
     N = len(INTRINSICS) * len(GROUND_TRUTH_FILES) * \
         len(N_VIEWS) * sum([m[2] for m in METHODS])
     print(f"Generating {N} experiments, beginning at experiment {start}...")
 
+    seeds = np.random.default_rng().integers(1, 10**8, size=N).tolist() if RANDOM_SEED else None
+
     fpath_base = PROJECT_ROOT_PATH / "share" / "Experiments" / "Results"
-    for intr in INTRINSICS:
-        for scene in GROUND_TRUTH_FILES:
-            for policy in METHODS:
-                for n_views in N_VIEWS:
-                    for rep in range(1, policy[2] + 1):
-                        n += 1
-                        if (n < start):
-                            continue
-
-                        seed = random.randrange(1, 1e8) if RANDOM_SEED else rep
-
-                        fpath = pathlib.Path(intr[0], scene.name.removesuffix(HDF5_EXTENSION),
-                                             policy[0], str(n_views), str(rep))
-                        print(f"({n} / {N}) {fpath}")
-
-                        fpath = fpath_base / fpath
-                        if fpath.exists() is False:
-                            fpath.mkdir(parents=True)
-                        fpath /= "results" + HDF5_EXTENSION
-
-                        if fpath.exists() is True and parsed_args.no_override:
-                            print("\tAlready exists. Skipping experiment...")
-                            continue
-
-                        call_process(fpath, scene, intr[1], policy[0], policy[1], n_views, seed, parsed_args)
+    existing: set[str] = set()
+    if parsed_args.no_override:
+        existing = {str(f) for f in fpath_base.glob("**/results" + HDF5_EXTENSION)}
+
+    # Experiment paths are joined as strings; building a `pathlib.Path` for each costs more.
+    fpath_base_str = str(fpath_base)
+
+    # Every experiment of the sweep in order, paired with its scene's name.
+    scenes = [(scene, scene.name.removesuffix(HDF5_EXTENSION)) for scene in GROUND_TRUTH_FILES]
+    experiments = ((intr, scene, policy, n_views, rep)
+                   for intr, scene, policy, n_views in itertools.product(INTRINSICS, scenes, METHODS, N_VIEWS)
+                   for rep in range(1, policy[2] + 1))
+
+    # Skip to the starting experiment without building anything for the ones before it.
+    skip = max(start - 1, 0)
+
+    jobs: list[Job] = []
+    result_dirs: set[str] = set()
+    for n, (intr, (scene, scene_name), policy, n_views, rep) in \
+            enumerate(itertools.islice(experiments, skip, None), start=skip + 1):
+        seed = seeds[n - 1] if RANDOM_SEED else rep
+
+        fpath = os.path.join(intr[0], scene_name, policy[0], str(n_views), str(rep))
+        label = f"({n} / {N}) {fpath}"
+
+        result_dir = os.path.join(fpath_base_str, fpath)
+        fpath = os.path.join(result_dir, "results" + HDF5_EXTENSION)
+
+        if fpath in existing:
+            print(label)
+            print("\tAlready exists. Skipping experiment...")
+            continue
+
+        result_dirs.add(result_dir)
+        jobs.append(Job(label, get_stdin(fpath, scene, intr, policy[0], n_views, seed, parsed_args)))
+
+    for result_dir in result_dirs:
+        os.makedirs(result_dir, exist_ok=True)
+
+    # Progress is printed by `run_jobs` as the experiments run.
+    for _ in run_jobs(EXECUTABLE_PATH, jobs, parsed_args.pause):
+        pass
 
 
 if __name__ == "__main__":